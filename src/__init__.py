@@ -30,15 +30,16 @@ bl_info = {
 #    Imports
 # ------------------------------------------------------------------------
 
-import os, webbrowser
+import os, re, shutil, struct, subprocess, tempfile, time, webbrowser
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import numpy as np
 import bpy
 
 from bpy.app.handlers import persistent
-from bpy.types import Operator, Panel, UIList, PropertyGroup
-from bpy.props import StringProperty, IntProperty, BoolProperty, PointerProperty, CollectionProperty
+from bpy.types import Operator, Panel, PropertyGroup
+from bpy.props import StringProperty, IntProperty, FloatProperty, BoolProperty, PointerProperty
 
 
 # ------------------------------------------------------------------------
@@ -55,6 +56,107 @@ class RF_RenderPart():
         self.border_max_y = border_max_y
 render_parts = []
 
+# Tile states stored in progress array
+TILE_PENDING = 0
+TILE_CLAIMED = 1
+TILE_DONE = 2
+TILE_FAILED = 3
+TILE_STATE_LABELS = ("Pending", "Claimed", "Done", "Failed")
+TILE_STATE_ICONS = ('CHECKBOX_DEHLT', 'TIME', 'CHECKBOX_HLT', 'ERROR')
+PROGRESS_HEATMAP_CELLS = 16
+PROGRESS_PAGE_SIZE = 8
+# Image file extensions recognized as rendered parts
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp', '.gif')
+
+# RenderProgress object to store tile states outside of scene data.
+# States live in a compact numpy array indexed [row, column] so
+# refreshing and drawing stays cheap even with thousands of parts.
+class RF_RenderProgress():
+    def __init__(self):
+        self.reset(0, "")
+
+    def reset(self, parts_count, prefix):
+        self.parts_count = parts_count
+        self.prefix = prefix
+        self.states = np.full((parts_count, parts_count), TILE_PENDING, dtype=np.uint8)
+        self.image_names = [None] * (parts_count * parts_count)
+        # Part names in row-major order and lookup back to grid position
+        leading_zeros = len(str(parts_count * parts_count)) - 1
+        self.part_names = []
+        self.part_index = {}
+        for row in range(parts_count):
+            for column in range(parts_count):
+                name = prefix + "_{}_{}".format(str(row + 1).zfill(leading_zeros), str(column + 1).zfill(leading_zeros))
+                self.part_names.append(name)
+                self.part_index[name] = (row, column)
+
+    def count(self, state):
+        return int(np.count_nonzero(self.states == state))
+
+    def set_state(self, row, column, state):
+        if row < self.parts_count and column < self.parts_count:
+            self.states[row, column] = state
+
+    # Downsample states to max_cells x max_cells grid for drawing.
+    # Each cell shows the most important state in its block of parts.
+    def get_heatmap(self, max_cells):
+        # Rows are drawn top to bottom as image y-axis, columns as x-axis
+        grid = self.states.T[::-1]
+        cells = min(self.parts_count, max_cells)
+        heatmap = np.full((cells, cells), TILE_PENDING, dtype=np.uint8)
+        if cells == 0:
+            return heatmap
+        edges = np.linspace(0, self.parts_count, cells + 1).astype(int)
+        for y in range(cells):
+            for x in range(cells):
+                block = grid[edges[y]:edges[y + 1], edges[x]:edges[x + 1]]
+                if (block == TILE_FAILED).any():
+                    heatmap[y, x] = TILE_FAILED
+                elif (block == TILE_DONE).all():
+                    heatmap[y, x] = TILE_DONE
+                elif (block == TILE_CLAIMED).any():
+                    heatmap[y, x] = TILE_CLAIMED
+        return heatmap
+render_progress = RF_RenderProgress()
+
+# Validation results of image parts by filepath: (mtime, size, width, height, valid)
+validation_cache = {}
+
+# Float channels stored per pixel for each enabled view layer pass
+RENDER_PASS_CHANNELS = {
+    'use_pass_combined': 4,
+    'use_pass_z': 1,
+    'use_pass_mist': 1,
+    'use_pass_normal': 3,
+    'use_pass_vector': 4,
+    'use_pass_uv': 3,
+    'use_pass_object_index': 1,
+    'use_pass_material_index': 1,
+    'use_pass_diffuse_direct': 3,
+    'use_pass_diffuse_indirect': 3,
+    'use_pass_diffuse_color': 3,
+    'use_pass_glossy_direct': 3,
+    'use_pass_glossy_indirect': 3,
+    'use_pass_glossy_color': 3,
+    'use_pass_transmission_direct': 3,
+    'use_pass_transmission_indirect': 3,
+    'use_pass_transmission_color': 3,
+    'use_pass_subsurface_direct': 3,
+    'use_pass_subsurface_indirect': 3,
+    'use_pass_subsurface_color': 3,
+    'use_pass_emit': 3,
+    'use_pass_environment': 3,
+    'use_pass_ambient_occlusion': 3,
+    'use_pass_shadow': 3,
+}
+# Render buffers and render result both hold every pass
+RENDER_BUFFER_COPIES = 2
+# Calibration render size as a fraction of image width and height
+CALIBRATION_BORDER = 0.125
+# Seconds to wait for calibration render before giving up
+CALIBRATION_TIMEOUT = 1800
+AUTO_PARTS_COUNT_MAX = 64
+
 # Utilities
 # ----------------------------------------------------
 class RF_Utils():    
@@ -111,7 +213,7 @@ class RF_Utils():
             # Limit file scan only to selected directory
             del dirs[:] 
             for file in files:
-                if (file.lower().endswith(('.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif'))):
+                if (file.lower().endswith(IMAGE_EXTENSIONS)):
                     if file_extension is not True:
                         # Remove file extension if needed
                         render_files.append(os.path.splitext(os.path.basename(file))[0])                        
@@ -119,53 +221,207 @@ class RF_Utils():
                         render_files.append(file)
         return render_files
 
-    # Refresh render list with found image filenames
+    # Refresh render progress with found image files
     def refresh_render_list(scene):
-        # Clear render_list and add image filenames to it
-        render_files = RF_Utils.get_files_in_folder(scene.render_settings.render_folder)
-        scene.render_list.clear()
-        prefix = str(scene.render_settings.filename_prefix).replace(" ", "")
-        for file in render_files:
-            # Add only names that starts with 'prefix' to list
-            if str(file).startswith(prefix):
-                item = scene.render_list.add()
-                item.image_name = file
-        
+        parts_count = scene.render_settings.parts_count
+        prefix = scene.render_settings.filename_prefix
+        if render_progress.parts_count != parts_count or render_progress.prefix != prefix:
+            render_progress.reset(parts_count, prefix)
+
+        # Zero-byte files are dummy images reserved by a rendering instance
+        states = np.full((parts_count, parts_count), TILE_PENDING, dtype=np.uint8)
+        image_names = [None] * (parts_count * parts_count)
+        path = os.path.realpath(bpy.path.abspath(scene.render_settings.render_folder))
+        if os.path.isdir(path):
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    name, extension = os.path.splitext(entry.name)
+                    if name not in render_progress.part_index or extension.lower() not in IMAGE_EXTENSIONS:
+                        continue
+                    row, column = render_progress.part_index[name]
+                    stat = entry.stat()
+                    # Dummy image extension can differ from rendered image, keep the rendered one
+                    if stat.st_size == 0 and image_names[row * parts_count + column] is not None:
+                        continue
+                    image_names[row * parts_count + column] = entry.name
+                    if stat.st_size == 0:
+                        states[row, column] = TILE_CLAIMED
+                    else:
+                        states[row, column] = TILE_DONE
+                    # Parts found invalid by validation are rendered again
+                    cached = validation_cache.get(entry.path)
+                    if cached and cached[:4] == (stat.st_mtime_ns, stat.st_size) + RF_Utils.get_part_size(scene, row, column) and cached[4] is False:
+                        states[row, column] = TILE_FAILED
+
+        # Keep failed parts without any file failed so they are rendered again
+        failed = (render_progress.states == TILE_FAILED) & (states == TILE_PENDING)
+        states[failed] = TILE_FAILED
+        render_progress.states = states
+        render_progress.image_names = image_names
+
         # Update rendered parts value in UI
-        scene.render_settings.rendered_parts_count = len(render_files)
-        
+        scene.render_settings.total_parts_count = parts_count * parts_count
+        scene.render_settings.rendered_parts_count = render_progress.count(TILE_DONE)
+
         # Check if all parts rendered
-        if (len(scene.render_list) == scene.render_settings.total_parts_count):
+        if (scene.render_settings.rendered_parts_count == scene.render_settings.total_parts_count):
             scene.render_settings.all_parts_rendered = True
         else:
             scene.render_settings.all_parts_rendered = False
 
     # Refresh render parts for rendering process to get not-rendered images based on image files
     def refresh_render_parts(scene):        
-        rndr = scene.render
         parts_count = scene.render_settings.parts_count
-        scene.render_settings.total_parts_count = parts_count * parts_count
-        leading_zeros = len(str(scene.render_settings.total_parts_count)) - 1
         RF_Utils.refresh_render_list(scene)
         render_parts.clear()
-        for row in range(parts_count):
-            for column in range(parts_count):
-                filename = scene.render_settings.filename_prefix + "_{}_{}".format(str(row + 1).zfill(leading_zeros), str(column + 1).zfill(leading_zeros))
-                if not any(filename == os.path.splitext(listitem.image_name)[0] for listitem in scene.render_list):
-                    border_min_x = (1 / parts_count) * row
-                    border_max_x = (1 / parts_count) * (row + 1)
-                    border_min_y = (1 / parts_count) * column
-                    border_max_y = (1 / parts_count) * (column + 1)
-                    temp_part = RF_RenderPart(filename, border_min_x, border_max_x, border_min_y, border_max_y)
-                    render_parts.append(temp_part)        
+        for row, column in np.argwhere(np.isin(render_progress.states, (TILE_PENDING, TILE_FAILED))):
+            filename = render_progress.part_names[row * parts_count + column]
+            border_min_x = (1 / parts_count) * row
+            border_max_x = (1 / parts_count) * (row + 1)
+            border_min_y = (1 / parts_count) * column
+            border_max_y = (1 / parts_count) * (column + 1)
+            temp_part = RF_RenderPart(filename, border_min_x, border_max_x, border_min_y, border_max_y)
+            render_parts.append(temp_part)        
 
     # Create dummy image file for reserving image slot 
     # before rendering huge images with multiple computers.
     # It's not bulletproof but still can prevent multiple
     # instance of same image rendering process.
-    def create_dummy_image(image_name, image_format, path):
+    def create_dummy_image(image_name, image_format, path, truncate = False):
         filepath = os.path.realpath(bpy.path.abspath(path)) + '.' + str(image_format).lower()
-        open(filepath, 'a').close()
+        # Truncate invalid part so other instances see it reserved again
+        open(filepath, 'w' if truncate else 'a').close()
+
+    # Read image size and completeness from file header and trailer
+    # without decoding pixels. Returns (width, height, complete) or None.
+    def read_image_header(filepath):
+        try:
+            with open(filepath, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                head = f.read(32)
+
+                # PNG: IHDR chunk first and IEND chunk at the end
+                if head[:8] == b'\x89PNG\r\n\x1a\n' and head[12:16] == b'IHDR':
+                    width, height = struct.unpack('>II', head[16:24])
+                    f.seek(-12, os.SEEK_END)
+                    return width, height, f.read(12) == b'\x00\x00\x00\x00IEND\xaeB`\x82'
+
+                # JPEG: walk segment headers to frame header, EOI marker at the end
+                if head[:2] == b'\xff\xd8':
+                    f.seek(2)
+                    while True:
+                        marker = f.read(4)
+                        if len(marker) < 4 or marker[0] != 0xFF:
+                            return None
+                        length = struct.unpack('>H', marker[2:4])[0]
+                        if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                            height, width = struct.unpack('>HH', f.read(5)[1:5])
+                            f.seek(-2, os.SEEK_END)
+                            return width, height, f.read(2) == b'\xff\xd9'
+                        f.seek(length - 2, os.SEEK_CUR)
+
+                # BMP: file size stored in header
+                if head[:2] == b'BM' and len(head) >= 26:
+                    file_size, = struct.unpack('<I', head[2:6])
+                    width, height = struct.unpack('<ii', head[18:26])
+                    return width, abs(height), file_size == size
+
+                # GIF: logical screen size and trailer byte
+                if head[:6] in (b'GIF87a', b'GIF89a'):
+                    width, height = struct.unpack('<HH', head[6:10])
+                    f.seek(-1, os.SEEK_END)
+                    return width, height, f.read(1) == b'\x3b'
+
+                # TIFF: first IFD tags, image strips must fit in file
+                if head[:4] in (b'II*\x00', b'MM\x00*'):
+                    order = '<' if head[:2] == b'II' else '>'
+                    ifd_offset, = struct.unpack(order + 'I', head[4:8])
+                    f.seek(ifd_offset)
+                    entry_count, = struct.unpack(order + 'H', f.read(2))
+                    tags = {}
+                    for i in range(entry_count):
+                        tag, value_type, count, value = struct.unpack(order + 'HHI4s', f.read(12))
+                        tags[tag] = (value_type, count, value)
+                    def tag_values(tag):
+                        value_type, count, value = tags[tag]
+                        value_format = 'H' if value_type == 3 else 'I'
+                        # Corrupted count could not fit in file
+                        if count * struct.calcsize(value_format) > size:
+                            raise ValueError("Invalid TIFF tag count: " + str(count))
+                        data = value
+                        if count * struct.calcsize(value_format) > 4:
+                            f.seek(struct.unpack(order + 'I', value)[0])
+                            data = f.read(count * struct.calcsize(value_format))
+                        return struct.unpack(order + value_format * count, data[:count * struct.calcsize(value_format)])
+                    width, height = tag_values(256)[0], tag_values(257)[0]
+                    complete = True
+                    if 273 in tags and 279 in tags:
+                        complete = all(offset + count <= size for offset, count in zip(tag_values(273), tag_values(279)))
+                    return width, height, complete
+
+        except (OSError, struct.error, KeyError, ValueError) as e:
+            print(e)
+        return None
+
+    # Check that image part header matches expected size and file is complete
+    def validate_image_part(filepath, width, height):
+        header = RF_Utils.read_image_header(filepath)
+        if header is None:
+            return False
+        # Allow one pixel rounding difference in border size
+        return header[2] is True and abs(header[0] - width) <= 1 and abs(header[1] - height) <= 1
+
+    # Get expected image size in pixels of rendered part
+    def get_part_size(scene, row, column):
+        rndr = scene.render
+        parts_count = scene.render_settings.parts_count
+        resolution_multiplier = rndr.resolution_percentage / 100
+        image_width = int(rndr.resolution_x * resolution_multiplier)
+        image_height = int(rndr.resolution_y * resolution_multiplier)
+        if scene.render_settings.crop_border is True:
+            width = int(image_width * (row + 1) / parts_count) - int(image_width * row / parts_count)
+            height = int(image_height * (column + 1) / parts_count) - int(image_height * column / parts_count)
+            return width, height
+        return image_width, image_height
+
+    # Validate rendered image parts in parallel and mark invalid parts as failed.
+    # Dummy images older than reservation timeout are failed too, e.g. from crashed computer.
+    # Results are cached by modification time and size so only changed files are read.
+    # Returns count of invalid parts.
+    def validate_render_parts(scene):
+        RF_Utils.refresh_render_list(scene)
+        parts_count = render_progress.parts_count
+        folder = os.path.realpath(bpy.path.abspath(scene.render_settings.render_folder))
+
+        jobs = {}
+        for row, column in np.argwhere(render_progress.states != TILE_PENDING):
+            image_name = render_progress.image_names[row * parts_count + column]
+            if image_name is None:
+                continue
+            filepath = os.path.join(folder, image_name)
+            try:
+                stat = os.stat(filepath)
+            except OSError:
+                continue
+            key = (stat.st_mtime_ns, stat.st_size) + RF_Utils.get_part_size(scene, row, column)
+            if stat.st_size == 0:
+                # Dummy image older than reservation timeout is left by stopped or crashed computer.
+                # Result stays valid in cache because dummy image only gets older.
+                if time.time() - stat.st_mtime > scene.render_settings.reservation_timeout * 3600:
+                    validation_cache[filepath] = key + (False,)
+                continue
+            cached = validation_cache.get(filepath)
+            if cached is None or cached[:4] != key:
+                jobs[filepath] = key
+
+        # Header reads are I/O bound so threads can run them in parallel
+        with ThreadPoolExecutor() as executor:
+            results = executor.map(lambda item: RF_Utils.validate_image_part(item[0], item[1][2], item[1][3]), jobs.items())
+            for (filepath, key), valid in zip(jobs.items(), results):
+                validation_cache[filepath] = key + (valid,)
+
+        RF_Utils.refresh_render_list(scene)
+        return render_progress.count(TILE_FAILED)
 
     # Check if all image parts is reandered and return valid list
     def get_all_image_parts(context, file_extension = True):
@@ -178,16 +434,23 @@ class RF_Utils():
 
         scene = context.scene
         rndr = scene.render
-        RF_Utils.refresh_render_list(scene)
+
+        # Re-queue broken parts before spending time on merging
+        invalid_parts_count = RF_Utils.validate_render_parts(scene)
+        if invalid_parts_count > 0:
+            RF_Utils.show_message_box(str(invalid_parts_count) + " invalid parts found and queued for rendering", "Unable to Start Merge Process", "ERROR")
+            return False
+        claimed_parts_count = render_progress.count(TILE_CLAIMED)
+        if claimed_parts_count > 0:
+            RF_Utils.show_message_box(str(claimed_parts_count) + " parts still in progress", "Unable to Start Merge Process", "ERROR")
+            return False
 
         if scene.render_settings.all_parts_rendered is False or scene.render_settings.crop_border is False or scene.render_settings.parts_count % 2 != 0:
             RF_Utils.show_message_box("The requirements for the merge process are not met", "Unable to Start Merge Process", "ERROR")
             return False
         
-        # Get all rendered images from list        
-        rendered_images = []
-        for item in scene.render_list:
-            rendered_images.append(item.image_name)
+        # Get all rendered images in row-major order
+        rendered_images = list(render_progress.image_names)
         
         parts_count = scene.render_settings.parts_count
         total_parts_count = scene.render_settings.total_parts_count = parts_count * parts_count
@@ -276,6 +539,46 @@ class RF_Utils():
                     RF_Utils.show_message_box("Cannot merge images properly: " + excepName, "Merge Failed", "ERROR")
                     print(e)
 
+    # Get bytes needed per rendered pixel by enabled passes in all view layers
+    def get_pixel_bytes(scene):
+        channels = 0
+        for view_layer in scene.view_layers:
+            if view_layer.use:
+                channels += sum(count for name, count in RENDER_PASS_CHANNELS.items() if getattr(view_layer, name, False))
+        # Combined pass is always rendered
+        return max(channels, 4) * 4 * RENDER_BUFFER_COPIES
+
+    # Get rendered pixel count of one part with given parts count
+    def get_part_pixel_count(scene, parts_count):
+        rndr = scene.render
+        resolution_multiplier = rndr.resolution_percentage / 100
+        pixel_count = int(rndr.resolution_x * resolution_multiplier) * int(rndr.resolution_y * resolution_multiplier)
+        # Without cropping the whole image buffer is allocated for every part
+        if scene.render_settings.crop_border is True:
+            pixel_count /= parts_count * parts_count
+        return pixel_count
+
+    # Estimate peak memory in megabytes for rendering one part. Scene memory
+    # such as geometry, textures and sampling data comes from calibration render.
+    def estimate_part_memory(scene, parts_count):
+        pixel_memory = RF_Utils.get_part_pixel_count(scene, parts_count) * RF_Utils.get_pixel_bytes(scene) / (1024 * 1024)
+        return scene.render_settings.calibration_memory + pixel_memory
+
+    # Get smallest even parts count that fits in memory budget, None if nothing fits.
+    # Fewer parts means less scene preparation overhead repeated per part.
+    def get_auto_parts_count(scene):
+        for parts_count in range(2, AUTO_PARTS_COUNT_MAX + 1, 2):
+            if RF_Utils.estimate_part_memory(scene, parts_count) <= scene.render_settings.memory_budget:
+                return parts_count
+        return None
+
+    # Parse peak memory in megabytes from render stats string
+    def parse_peak_memory(stats):
+        match = re.search(r"Peak[:\s]*([\d.]+)\s*([KMG])", stats)
+        if match is None:
+            return None
+        return float(match.group(1)) * {'K': 1 / 1024, 'M': 1, 'G': 1024}[match.group(2)]
+
     # Show pop-up message window for user
     def show_message_box(message = "", title = "Message", icon = 'INFO'):
         def draw(self, context):
@@ -339,10 +642,35 @@ class RF_PROP_RenderSettings (PropertyGroup):
         name="All parts rendered",
         default=False
     )
-
-class RF_PROP_RenderListItem (PropertyGroup):
-    image_name: StringProperty()
-    image_id: IntProperty()
+    auto_parts_count: BoolProperty(
+        name="Auto Parts Count",
+        description="Choose parts count to fit rendering in memory budget when starting a new render",
+        default=False
+    )
+    memory_budget: IntProperty(
+        name="RAM Budget (MB)",
+        description="RAM available for rendering one part on the smallest rendering computer. GPU memory is not measured, so VRAM is not covered by this budget",
+        default=4096,
+        min=64
+    )
+    calibration_memory: FloatProperty(
+        name="Scene Memory (MB)",
+        description="Scene memory measured by calibration render without image buffers",
+        default=0.0,
+        min=0.0
+    )
+    reservation_timeout: IntProperty(
+        name="Reservation Timeout (hours)",
+        description="Empty dummy images older than this are treated as left by a stopped computer and rendered again",
+        default=24,
+        min=1
+    )
+    progress_page: IntProperty(
+        name="Page",
+        description="Page of rendered parts list",
+        default=1,
+        min=1
+    )
 
 
 # ------------------------------------------------------------------------
@@ -417,6 +745,22 @@ class RF_OT_StartRender(Operator):
 
         context.scene.render_settings.stop_rendering = False
 
+        # Auto parts count can change only before any part is rendered,
+        # otherwise parts with different grid would be mixed in same folder
+        scene = context.scene
+        prefix = scene.render_settings.filename_prefix + "_"
+        if scene.render_settings.auto_parts_count is True and not any(file.startswith(prefix) for file in RF_Utils.get_files_in_folder(scene.render_settings.render_folder)):
+            # Estimate without scene memory would fit almost any budget
+            if scene.render_settings.calibration_memory == 0:
+                self.report({'ERROR'}, "Auto parts count requires memory calibration")
+                return {'CANCELLED'}
+            parts_count = RF_Utils.get_auto_parts_count(scene)
+            if parts_count is None:
+                self.report({'WARNING'}, "No parts count fits in memory budget, using " + str(scene.render_settings.parts_count))
+            else:
+                scene.render_settings.parts_count = parts_count
+                self.report({'INFO'}, "Auto parts count: {0} x {0} ({1:.1f} MB per part)".format(parts_count, RF_Utils.estimate_part_memory(scene, parts_count)))
+
         # Define the variables during execution. This allows to define when called from a button
         self.stop = False
         self.rendering = False
@@ -478,11 +822,20 @@ class RF_OT_StartRender(Operator):
                         bpy.ops.render.render("INVOKE_DEFAULT", write_still=True)
                     else:
                         # Create small dummy image before rendering to prevent multiple renderings                    
-                        RF_Utils.create_dummy_image(chunk.name, rndr.image_settings.file_format, filepath)
+                        failed = render_progress.states[render_progress.part_index[chunk.name]] == TILE_FAILED
+                        # Use rendered file extension so render overwrites dummy image (e.g. JPEG is saved as .jpg)
+                        RF_Utils.create_dummy_image(chunk.name, rndr.file_extension.lstrip('.'), filepath, bool(failed))
+                        render_progress.set_state(*render_progress.part_index[chunk.name], TILE_CLAIMED)
                         bpy.ops.render.render(write_still=True)
 
                 except Exception as e:
                     excepName = type(e).__name__
+                    # Remove dummy image so failed part is not left reserved
+                    dummy_filepath = os.path.realpath(bpy.path.abspath(filepath)) + rndr.file_extension
+                    if os.path.isfile(dummy_filepath) and os.path.getsize(dummy_filepath) == 0:
+                        os.remove(dummy_filepath)
+                    render_progress.set_state(*render_progress.part_index[chunk.name], TILE_FAILED)
+                    self.remove_handlers(context, event)
                     RF_Utils.show_message_box(str(e)[:-1], "Render Failed", "ERROR")
                     return {"FINISHED"} 
 
@@ -499,7 +852,7 @@ class RF_OT_StopRender(Operator):
     # Disable/enable button
     @classmethod
     def poll(self, context):
-        return context.scene.render_settings.rendered_parts_count > 0
+        return render_progress.count(TILE_CLAIMED) + context.scene.render_settings.rendered_parts_count > 0
     
     def execute(self, context):
         scene = context.scene
@@ -521,6 +874,85 @@ class RF_OT_RefreshList(Operator):
         RF_Utils.refresh_render_list(scene)
         return{'FINISHED'}
 
+# OT: Validate Images
+# ----------------------------------------------------
+
+class RF_OT_ValidateImages(Operator):
+    bl_label = "Validate Images"
+    bl_idname = "rp.validate_images"
+    bl_description = "Check rendered parts for incomplete files and wrong image sizes and queue invalid parts for rendering"
+    def execute(self, context):
+        print(self.bl_label)
+        scene = context.scene
+        invalid_parts_count = RF_Utils.validate_render_parts(scene)
+        if invalid_parts_count > 0:
+            self.report({'WARNING'}, str(invalid_parts_count) + " invalid parts queued for rendering")
+        elif render_progress.count(TILE_CLAIMED) > 0:
+            self.report({'INFO'}, "Rendered parts are valid, " + str(render_progress.count(TILE_CLAIMED)) + " parts still in progress")
+        else:
+            self.report({'INFO'}, "All rendered parts are valid")
+        return{'FINISHED'}
+
+# OT: Calibrate Memory
+# ----------------------------------------------------
+
+class RF_OT_CalibrateMemory(Operator):
+    bl_label = "Calibrate Memory"
+    bl_idname = "rp.calibrate_memory"
+    bl_description = "Render small region in background Blender to measure scene memory used for auto parts count.\nBlender will be frozen for the duration of the render"
+
+    def execute(self, context):
+        print(self.bl_label)
+        scene = context.scene
+        rndr = scene.render
+
+        # Render stats with peak memory are printed only in background mode,
+        # so copy of current file is rendered in separate Blender process
+        temp_folder = tempfile.mkdtemp(prefix=bl_info['name'] + "_")
+        try:
+            filepath = os.path.join(temp_folder, "calibration.blend")
+            bpy.ops.wm.save_as_mainfile(filepath=filepath, copy=True, check_existing=False)
+            script = (
+                "import bpy\n"
+                "rndr = bpy.context.scene.render\n"
+                "rndr.use_border = True\n"
+                "rndr.use_crop_to_border = True\n"
+                "rndr.border_min_x = rndr.border_min_y = 0\n"
+                "rndr.border_max_x = rndr.border_max_y = {}\n"
+                "bpy.ops.render.render()\n"
+            ).format(CALIBRATION_BORDER)
+            process = subprocess.run([bpy.app.binary_path, "-b", filepath, "-S", scene.name, "--python-expr", script], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True, timeout=CALIBRATION_TIMEOUT)
+        except (OSError, RuntimeError, subprocess.TimeoutExpired) as e:
+            self.report({'ERROR'}, "Calibration render failed: " + str(e))
+            return{'CANCELLED'}
+        finally:
+            shutil.rmtree(temp_folder, ignore_errors=True)
+
+        # Peak memory of crashed render would be underestimated
+        if process.returncode != 0:
+            print(process.stdout)
+            self.report({'ERROR'}, "Calibration render failed with exit code " + str(process.returncode))
+            return{'CANCELLED'}
+
+        peak_memory = None
+        for line in process.stdout.splitlines():
+            line_peak_memory = RF_Utils.parse_peak_memory(line)
+            if line_peak_memory is not None:
+                peak_memory = max(peak_memory or 0, line_peak_memory)
+
+        if peak_memory is None:
+            print(process.stdout)
+            self.report({'WARNING'}, "Render engine did not report memory usage")
+            return{'CANCELLED'}
+
+        # Remove image buffers of calibration region to get scene memory
+        resolution_multiplier = rndr.resolution_percentage / 100
+        pixel_count = int(rndr.resolution_x * resolution_multiplier * CALIBRATION_BORDER) * int(rndr.resolution_y * resolution_multiplier * CALIBRATION_BORDER)
+        pixel_memory = pixel_count * RF_Utils.get_pixel_bytes(scene) / (1024 * 1024)
+        scene.render_settings.calibration_memory = max(peak_memory - pixel_memory, 0)
+        self.report({'INFO'}, "Scene memory: {:.1f} MB".format(scene.render_settings.calibration_memory))
+        return{'FINISHED'}
+
 # OT: Open Render Folder
 # ----------------------------------------------------
 
@@ -609,9 +1041,25 @@ class RF_PT_Panel (Panel):
         box = row.box()    
 
         box.prop(scene.render_settings, "render_folder")
-        box.prop(scene.render_settings, "parts_count")
+        row = box.row()
+        row.enabled = not scene.render_settings.auto_parts_count
+        row.prop(scene.render_settings, "parts_count")
+        box.prop(scene.render_settings, "auto_parts_count")
+        if scene.render_settings.auto_parts_count is True:
+            box.prop(scene.render_settings, "memory_budget")
+            row = box.row()
+            row.label(text="Scene Memory: {:.1f} MB".format(scene.render_settings.calibration_memory))
+            row.operator("rp.calibrate_memory", icon="MEMORY")
+            parts_count = RF_Utils.get_auto_parts_count(scene)
+            if scene.render_settings.calibration_memory == 0:
+                box.label(text="Calibration required", icon="ERROR")
+            elif parts_count is None:
+                box.label(text="No parts count fits in memory budget", icon="ERROR")
+            else:
+                box.label(text="Auto Parts Count: {} ({:.1f} MB per part)".format(parts_count, RF_Utils.estimate_part_memory(scene, parts_count)))
         box.prop(scene.render_settings, "crop_border")
         box.prop(scene.render_settings, "show_render_window")
+        box.prop(scene.render_settings, "reservation_timeout")
         #box.prop(scene.render_settings, "overwrite_files")
 
         # Rendering Process
@@ -625,10 +1073,36 @@ class RF_PT_Panel (Panel):
         else:
             process_counter = str(scene.render_settings.rendered_parts_count) + ' / ' + str(scene.render_settings.total_parts_count)
         box.label(text="Rendered Parts: " + process_counter) 
-        box.template_list("RF_UL_RenderList", "", scene, "render_list", scene, "render_list_index", rows=3, maxrows=3)
+
+        # Heatmap of part states, downsampled so drawing cost stays flat
+        heatmap = render_progress.get_heatmap(PROGRESS_HEATMAP_CELLS)
+        if heatmap.size > 0:
+            grid = box.column(align=True)
+            for heatmap_row in heatmap:
+                grid_row = grid.row(align=True)
+                for state in heatmap_row:
+                    grid_row.label(text="", icon=TILE_STATE_ICONS[state])
+            legend = box.row()
+            for state, label in enumerate(TILE_STATE_LABELS):
+                legend.label(text=label + ": " + str(render_progress.count(state)), icon=TILE_STATE_ICONS[state])
+
+        # Paginated list of parts, only current page is drawn
+        page_count = max(1, -(-len(render_progress.part_names) // PROGRESS_PAGE_SIZE))
+        page = min(scene.render_settings.progress_page, page_count) - 1
+        column = box.column(align=True)
+        for index in range(page * PROGRESS_PAGE_SIZE, min((page + 1) * PROGRESS_PAGE_SIZE, len(render_progress.part_names))):
+            row_index, column_index = divmod(index, render_progress.parts_count)
+            state = render_progress.states[row_index, column_index]
+            split = column.split(factor=0.7)
+            split.label(text=render_progress.image_names[index] or render_progress.part_names[index], icon='IMAGE_DATA')
+            split.label(text=TILE_STATE_LABELS[state], icon=TILE_STATE_ICONS[state])
+        row = box.row(align=True)
+        row.prop(scene.render_settings, "progress_page")
+        row.label(text="/ " + str(page_count))
         
         # Buttons
         box.operator("rp.refresh_list", icon="FILE_REFRESH")        
+        box.operator("rp.validate_images", icon="CHECKMARK")
         box.operator("rp.open_render_folder", icon="FILE_FOLDER")
         box.operator("rp.reset_border", icon="SELECT_SET")
         
@@ -645,17 +1119,6 @@ class RF_PT_Panel (Panel):
         row.alignment = 'RIGHT'
         row.label(text=bl_info['name'] + ' - ' + str(bl_info['version']).strip('()'))
 
-# ------------------------------------------------------------------------
-#    UIList (_UL_)
-# ------------------------------------------------------------------------
-
-class RF_UL_RenderList (UIList):
-
-    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
-        split = layout.split(factor=0.7)
-        split.label(text=item.image_name, icon = 'IMAGE_DATA')
-
-
 # ------------------------------------------------------------------------
 #    Registration
 # ------------------------------------------------------------------------
@@ -664,6 +1127,10 @@ class RF_UL_RenderList (UIList):
 def init_renderparts_member(dummy):
     bpy.ops.rp.init('INVOKE_DEFAULT')
 
+# Fill render progress when addon is enabled on already opened file
+def init_render_progress():
+    RF_Utils.refresh_render_list(bpy.context.scene)
+
 classes = (
 
     # Operators
@@ -671,6 +1138,8 @@ classes = (
     RF_OT_StartRender,
     RF_OT_StopRender,
     RF_OT_RefreshList,
+    RF_OT_ValidateImages,
+    RF_OT_CalibrateMemory,
     RF_OT_OpenRenderFolder,
     RF_OT_ResetBorder,
     RF_OT_MergeImages,
@@ -678,10 +1147,8 @@ classes = (
     # Panel
     RF_PT_Panel,
     
-    # List
+    # Properties
     RF_PROP_RenderSettings,
-    RF_PROP_RenderListItem,
-    RF_UL_RenderList,
 )
 
 def register():
@@ -691,11 +1158,10 @@ def register():
 
     # Custom scene properties
     bpy.types.Scene.render_settings = PointerProperty(type = RF_PROP_RenderSettings)
-    bpy.types.Scene.render_list = CollectionProperty(type = RF_PROP_RenderListItem)
-    bpy.types.Scene.render_list_index = IntProperty(name = "Index for render_list", default = 0) 
 
     # Used for initial image list update
     bpy.app.handlers.load_post.append(init_renderparts_member)
+    bpy.app.timers.register(init_render_progress, first_interval=0.1)
 
 def unregister():
     from bpy.utils import unregister_class
@@ -704,8 +1170,6 @@ def unregister():
 
     # Custom scene properties
     del bpy.types.Scene.render_settings
-    del bpy.types.Scene.render_list 
-    del bpy.types.Scene.render_list_index
 
     bpy.app.handlers.load_post.remove(init_renderparts_member)
 